@@ -6,7 +6,15 @@ Optionally groups files into batches based on filter criteria.
 
 import pandas as pd
 import os
-import glob
+import csv
+from collections import Counter
+
+
+OUTPUT_COLUMNS = ['ACTION', 'USER_NAME', 'INSTRUCTOR_ID', 'COURSE_ID']
+
+# Inputs at least this large are processed in chunks instead of loaded whole
+STREAM_THRESHOLD_BYTES = 1 << 30
+STREAM_CHUNK_SIZE = 250_000
 
 
 def create_output_directories():
@@ -18,31 +26,161 @@ def create_output_directories():
     return output_dir, batch_dir
 
 
-def validate_input_data(data):
+def read_input_file(input_file):
+    """
+    Read the input CSV file, preferring the multithreaded PyArrow parser.
+    
+    Falls back to pandas' C parser when PyArrow is not installed. Values are
+    read as text with no NA markers, matching the streaming reader, so IDs
+    keep leading zeros and only empty cells count as blank.
+    
+    Args:
+        input_file: Path to the input CSV file
+        
+    Returns:
+        pandas DataFrame containing the input data
+    """
+    try:
+        data = pd.read_csv(input_file, engine="pyarrow", dtype_backend="pyarrow",
+                           dtype=str, keep_default_na=False)
+        print("\nParsed input with the pyarrow engine.")
+    except ImportError:
+        data = pd.read_csv(input_file, dtype=str, keep_default_na=False)
+        print("\nPyArrow not installed; parsed input with the C engine.")
+    return data
+
+
+def read_header(input_file):
     """
-    Validate input CSV data for required columns and duplicates.
+    Read the raw header row of a CSV file.
+    
+    pandas' C parser renames repeated headers (COURSE_ID, COURSE_ID.1), so
+    the header is read with csv.reader to see the names as written.
+    
+    Args:
+        input_file: Path to the input CSV file
+        
+    Returns:
+        list: Column names in file order (empty for an empty file)
+    """
+    with open(input_file, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), [])
+
+
+def validate_header(header):
+    """
+    Validate the input CSV header for repeated and required columns.
     
     Args:
-        data: pandas DataFrame containing the input data
+        header: Column names as read by read_header
         
     Returns:
         bool: True if validation passes, False otherwise
     """
-    required_columns = ['ACTION', 'USER_NAME', 'INSTRUCTOR_ID', 'COURSE_ID']
+    required_columns = OUTPUT_COLUMNS
+    
+    # Check for repeated headers, which would break grouping by column name
+    repeated = sorted(col for col, count in Counter(header).items() if count > 1)
+    if repeated:
+        print(f"Error: Duplicate column headers in input file: {repeated}")
+        return False
     
     # Check for required columns
-    missing_columns = [col for col in required_columns if col not in data.columns]
+    columns = frozenset(header)
+    missing_columns = [col for col in required_columns if col not in columns]
     if missing_columns:
         print(f"Error: Missing required columns: {missing_columns}")
         return False
     
+    return True
+
+
+def validate_input_data(data):
+    """
+    Validate input CSV data for blank course IDs and duplicates.
+    
+    Args:
+        data: pandas DataFrame containing the input data, with a header
+            already checked by validate_header
+        
+    Returns:
+        bool: True if validation passes, False otherwise
+    """
+    # Check for rows without a course, which cannot be written to any file
+    blank_course_count = int((data['COURSE_ID'] == "").sum())
+    if blank_course_count:
+        print(f"\nWarning: {blank_course_count} rows have a blank COURSE_ID.")
+        print("These will not be written to any output file.")
+        
+        proceed = input("\nDo you want to continue anyway? (yes/no): ").strip().lower()
+        if proceed != "yes":
+            return False
+    
     # Check for duplicates (excluding ACTION column)
     check_columns = ['USER_NAME', 'INSTRUCTOR_ID', 'COURSE_ID']
-    duplicates = data[check_columns].duplicated()
+    has_duplicates = data.duplicated(subset=check_columns).any()
+    
+    if has_duplicates:
+        duplicates = data.duplicated(subset=check_columns, keep=False)
+        print("\nWarning: Duplicate entries found in input file:")
+        print(data.loc[duplicates, check_columns])
+        print("\nThese will be duplicated in output files.")
+        
+        proceed = input("\nDo you want to continue anyway? (yes/no): ").strip().lower()
+        if proceed != "yes":
+            return False
+    
+    return True
+
+
+def validate_input_stream(input_file, chunksize=STREAM_CHUNK_SIZE):
+    """
+    Check a large input file for blank course IDs and duplicates, one chunk
+    at a time, before any output is written.
+    
+    Only a 64-bit hash of each row's (USER_NAME, INSTRUCTOR_ID, COURSE_ID)
+    key is kept between chunks. Memory therefore still grows with the number
+    of distinct rows, at roughly 100 bytes per row, but not with their width.
+    
+    Args:
+        input_file: Path to the input CSV file
+        chunksize: Number of records to read per chunk
+        
+    Returns:
+        bool: True if validation passes, False otherwise
+    """
+    check_columns = ['USER_NAME', 'INSTRUCTOR_ID', 'COURSE_ID']
+    seen_keys = set()
+    duplicate_rows = []
+    blank_course_count = 0
+    
+    reader = pd.read_csv(input_file, usecols=check_columns, dtype=str,
+                         keep_default_na=False, chunksize=chunksize)
+    for chunk in reader:
+        blank_course_count += int((chunk['COURSE_ID'] == "").sum())
+        
+        # Track duplicates across the whole input
+        key_hashes = pd.util.hash_pandas_object(chunk, index=False).tolist()
+        duplicate_positions = []
+        for i, key_hash in enumerate(key_hashes):
+            if key_hash in seen_keys:
+                duplicate_positions.append(i)
+            else:
+                seen_keys.add(key_hash)
+        if duplicate_positions:
+            duplicate_rows.append(chunk.iloc[duplicate_positions])
     
-    if duplicates.any():
+    if blank_course_count:
+        print(f"\nWarning: {blank_course_count} rows have a blank COURSE_ID.")
+        print("These will not be written to any output file.")
+        
+        proceed = input("\nDo you want to continue anyway? (yes/no): ").strip().lower()
+        if proceed != "yes":
+            return False
+    
+    if duplicate_rows:
         print("\nWarning: Duplicate entries found in input file:")
-        print(data[duplicates][check_columns])
+        print(pd.concat(duplicate_rows, ignore_index=True))
         print("\nThese will be duplicated in output files.")
         
         proceed = input("\nDo you want to continue anyway? (yes/no): ").strip().lower()
@@ -57,40 +195,111 @@ def create_individual_csv_files(data, output_dir):
     Create individual CSV files for each unique COURSE_ID.
     
     Args:
-        data: pandas DataFrame containing the enrollment data
+        data: pandas DataFrame containing the enrollment data, with
+            COURSE_ID already converted to a category by main
         output_dir: Directory to save individual CSV files
         
     Returns:
-        list: List of unique course IDs processed
+        tuple: (list of unique course IDs processed,
+                dict mapping each course ID string to its DataFrame)
     """
-    # Extract columns
-    action = data['ACTION']
-    user_name = data['USER_NAME']
-    instructor_id = data['INSTRUCTOR_ID']
-    course_id = data['COURSE_ID']
-    
-    # Get unique COURSE_IDs
-    unique_course_ids = course_id.unique()
-    
-    # Create individual CSV files for each COURSE_ID
-    for unique_id in unique_course_ids:
-        # Create a new dataframe for this course_id
-        course_data = pd.DataFrame({
-            'ACTION': action,
-            'USER_NAME': user_name,
-            'INSTRUCTOR_ID': instructor_id,
-            'COURSE_ID': unique_id
-        })
-        
-        # Save to CSV
-        output_file = os.path.join(output_dir, f"{unique_id}.csv")
-        course_data.to_csv(output_file, index=False)
+    # Rows without a course were reported by validate_input_data
+    data = data[data['COURSE_ID'] != ""]
+    
+    # Partition rows by COURSE_ID in a single pass
+    groups = list(data.groupby('COURSE_ID', sort=False, observed=True))
+    unique_course_ids = [course_id for course_id, _ in groups]
+    course_frames = {str(course_id): course_data[OUTPUT_COLUMNS]
+                     for course_id, course_data in groups}
+    
+    # Save each course to its own CSV file
+    for course_id in unique_course_ids:
+        output_file = os.path.join(output_dir, f"{course_id}.csv")
+        course_frames[str(course_id)].to_csv(output_file, index=False)
         print(f"Created file: {output_file}")
     
+    return unique_course_ids, course_frames
+
+
+def stream_individual_csv_files(input_file, output_dir, chunksize=STREAM_CHUNK_SIZE):
+    """
+    Create individual CSV files for each unique COURSE_ID without loading
+    the whole input into memory.
+    
+    Reads the input in chunks and appends each chunk's rows to the matching
+    course files. Values are read as text so every chunk is written the same
+    way, whatever types a given chunk would have inferred. Run
+    validate_input_stream first; rows with a blank COURSE_ID are skipped.
+    
+    Args:
+        input_file: Path to the input CSV file
+        output_dir: Directory to save individual CSV files
+        chunksize: Number of records to read per chunk
+        
+    Returns:
+        list: List of unique course IDs processed
+    """
+    unique_course_ids = []
+    written = set()
+    
+    reader = pd.read_csv(input_file, usecols=OUTPUT_COLUMNS, dtype=str,
+                         keep_default_na=False, chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk[chunk['COURSE_ID'] != ""]
+        
+        # Append this chunk's rows to each course file, writing the header once.
+        # Files are reopened per chunk so 1000+ courses don't exhaust file handles.
+        for course_id, course_data in chunk.groupby('COURSE_ID', sort=False):
+            output_file = os.path.join(output_dir, f"{course_id}.csv")
+            first_write = course_id not in written
+            
+            with open(output_file, "w" if first_write else "a", newline="") as handle:
+                course_data[OUTPUT_COLUMNS].to_csv(handle, header=first_write, index=False)
+            
+            if first_write:
+                written.add(course_id)
+                unique_course_ids.append(course_id)
+                print(f"Created file: {output_file}")
+    
     return unique_course_ids
 
 
-def create_batch_files(output_dir, batch_dir, filter_criteria):
+def _copy_lines(src, out):
+    """Yield each line of src after writing it unchanged to out."""
+    for line in src:
+        out.write(line)
+        yield line
+
+
+def _concat_batch_files(filtered_files, batch_path):
+    """
+    Concatenate individual CSV files on disk into a single batch file.
+    
+    Args:
+        filtered_files: Paths of the individual CSV files to combine
+        batch_path: Path of the batch file to write
+        
+    Returns:
+        int: Number of records written to the batch file
+    """
+    record_count = 0
+    
+    # Files share one header, so copy the text unchanged instead of parsing
+    # it into DataFrames. csv.reader only counts records as they are copied,
+    # so quoted fields containing newlines are still counted once.
+    with open(batch_path, "w", newline="", encoding="utf-8") as out:
+        for i, f in enumerate(filtered_files):
+            with open(f, newline="", encoding="utf-8") as src:
+                header = next(src, "")
+                if i == 0:
+                    out.write(header)
+                
+                record_count += sum(1 for row in csv.reader(_copy_lines(src, out)) if row)
+    
+    return record_count
+
+
+def create_batch_files(output_dir, batch_dir, filter_criteria, course_frames=None):
     """
     Group individual CSV files into batches based on filter criteria.
     
@@ -98,29 +307,43 @@ def create_batch_files(output_dir, batch_dir, filter_criteria):
         output_dir: Directory containing individual CSV files
         batch_dir: Directory to save batch CSV files
         filter_criteria: String to filter filenames by
+        course_frames: Optional dict mapping course IDs to their DataFrames,
+            as returned by create_individual_csv_files. When given, batches
+            are built in memory instead of re-reading files from output_dir.
     """
-    # Find all CSV files matching the filter criteria
-    all_files = glob.glob(os.path.join(output_dir, "*.csv"))
-    filtered_files = [f for f in all_files if filter_criteria in os.path.basename(f)]
+    batch_filename = f"{filter_criteria}_batch.csv"
+    batch_path = os.path.join(batch_dir, batch_filename)
     
-    if not filtered_files:
+    if course_frames is not None:
+        # Select in-memory course frames matching the filter criteria
+        filtered = {k: v for k, v in course_frames.items() if filter_criteria in k}
+        filtered_names = [f"{k}.csv" for k in filtered]
+    else:
+        # Find all CSV files matching the filter criteria in one directory pass
+        with os.scandir(output_dir) as entries:
+            filtered = [e for e in entries
+                        if e.is_file() and e.name.endswith(".csv") and filter_criteria in e.name]
+        filtered_files = [e.path for e in filtered]
+        filtered_names = [e.name for e in filtered]
+    
+    if not filtered_names:
         print(f"\nNo files found matching criteria: '{filter_criteria}'")
         return
     
-    print(f"\nFound {len(filtered_files)} files matching '{filter_criteria}':")
-    for f in filtered_files:
-        print(f"  - {os.path.basename(f)}")
+    print(f"\nFound {len(filtered_names)} files matching '{filter_criteria}':")
+    for name in filtered_names:
+        print(f"  - {name}")
     
-    # Concatenate all matching files
-    batch_data = pd.concat([pd.read_csv(f) for f in filtered_files], ignore_index=True)
-    
-    # Save batch file
-    batch_filename = f"{filter_criteria}_batch.csv"
-    batch_path = os.path.join(batch_dir, batch_filename)
-    batch_data.to_csv(batch_path, index=False)
+    # Concatenate all matching courses and save batch file
+    if course_frames is not None:
+        batch_data = pd.concat(filtered.values(), ignore_index=True)
+        batch_data.to_csv(batch_path, index=False)
+        record_count = len(batch_data)
+    else:
+        record_count = _concat_batch_files(filtered_files, batch_path)
     
     print(f"\nCreated batch file: {batch_path}")
-    print(f"Total records in batch: {len(batch_data)}")
+    print(f"Total records in batch: {record_count}")
 
 
 def main():
@@ -136,25 +359,52 @@ def main():
         print(f"Error: File not found: {input_file}")
         return
     
-    # Read the input CSV file
+    # Validate the header before reading any records
     try:
-        data = pd.read_csv(input_file)
-        print(f"\nLoaded {len(data)} records from input file.")
+        header = read_header(input_file)
     except Exception as e:
         print(f"Error reading CSV file: {e}")
         return
     
-    # Validate input data
-    if not validate_input_data(data):
+    if not validate_header(header):
         print("\nValidation failed. Exiting.")
         return
     
+    # Read the input CSV file
+    streaming = os.path.getsize(input_file) >= STREAM_THRESHOLD_BYTES
+    if streaming:
+        # Too large to load at once; check the records in a separate pass
+        # before anything is written, then stream them into course files
+        print(f"\nLarge input file; processing in chunks of {STREAM_CHUNK_SIZE} records.")
+        if not validate_input_stream(input_file):
+            print("\nValidation failed. Exiting.")
+            return
+    else:
+        try:
+            data = read_input_file(input_file)
+            print(f"\nLoaded {len(data)} records from input file.")
+        except Exception as e:
+            print(f"Error reading CSV file: {e}")
+            return
+        
+        # Validate input data
+        if not validate_input_data(data):
+            print("\nValidation failed. Exiting.")
+            return
+        
+        # Dictionary-encode COURSE_ID so grouping hashes integer codes, not strings
+        data['COURSE_ID'] = data['COURSE_ID'].astype('category')
+    
     # Create output directories
     output_dir, batch_dir = create_output_directories()
     
     # Create individual CSV files
     print("\nCreating individual CSV files...")
-    unique_course_ids = create_individual_csv_files(data, output_dir)
+    if streaming:
+        unique_course_ids = stream_individual_csv_files(input_file, output_dir)
+        course_frames = None
+    else:
+        unique_course_ids, course_frames = create_individual_csv_files(data, output_dir)
     print(f"\nCreated {len(unique_course_ids)} individual CSV files in '{output_dir}' directory.")
     
     # Ask about batch grouping
@@ -178,7 +428,7 @@ def main():
             if filter_criteria.lower() == 'done':
                 break
             
-            create_batch_files(output_dir, batch_dir, filter_criteria)
+            create_batch_files(output_dir, batch_dir, filter_criteria, course_frames)
             
             another = input("\nCreate another batch? (yes/no): ").strip().lower()
             if another != "yes":
@@ -4,17 +4,20 @@ Automates the process of uploading multiple CSV files through a web interface.
 """
 
 import os
-import time
+import queue
 import logging
+import argparse
+import threading
 from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.firefox.service import Service
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.firefox import GeckoDriverManager
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
 
 
 # Configuration
@@ -23,21 +26,28 @@ class Config:
     # Change to production URL when ready
     PLATFORM_URL = "https://test.example.com/bulk-user-management"
     
-    # XPath locators - update these based on your platform
-    XPATHS = {
-        'file_upload': "//input[@id='ctl_7' and @type='file']",
-        'email_checkbox': "//input[@id='z_f' and @type='checkbox']",
-        'validate_button': "//button[@id='z_a' and contains(text(), 'Validate File')]",
-        'see_results': "//button[@id='z_a' and contains(text(), 'See Validation Results')]",
-        'continue_options': "//button[@id='z_a' and contains(text(), 'Continue to Options')]",
-        'import_now': "//button[@id='z_a' and contains(text(), 'Import Now')]",
-        'view_summary': "//button[@id='z_a' and contains(text(), 'View Summary')]",
-        'done': "//button[@id='z_a' and contains(text(), 'Done')]",
+    # Element locators as (By strategy, selector, button text or None)
+    # Update these based on your platform. The action buttons share one id,
+    # so they are looked up by id and told apart by their visible text.
+    LOCATORS = {
+        'file_upload': (By.CSS_SELECTOR, "input#ctl_7[type='file']", None),
+        'email_checkbox': (By.CSS_SELECTOR, "input#z_f[type='checkbox']", None),
+        'validate_button': (By.ID, "z_a", "Validate File"),
+        'see_results': (By.ID, "z_a", "See Validation Results"),
+        'continue_options': (By.ID, "z_a", "Continue to Options"),
+        'import_now': (By.ID, "z_a", "Import Now"),
+        'view_summary': (By.ID, "z_a", "View Summary"),
+        'done': (By.ID, "z_a", "Done"),
     }
     
     # Timeouts (in seconds)
     DEFAULT_TIMEOUT = 300  # 5 minutes
     FILE_UPLOAD_TIMEOUT = 600  # 10 minutes for large files
+    FORM_READY_TIMEOUT = 10  # Upload form reappearing between files
+    LOGIN_CHECK_TIMEOUT = 10  # Looking for a session saved in the profile
+    
+    # Firefox profile reused across runs so the login session persists
+    PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".bulk_uploader_profile")
 
 
 # Set up logging
@@ -57,52 +67,126 @@ def setup_logging(script_dir):
     return logging.getLogger(__name__)
 
 
-def wait_for_element(driver, xpath, timeout=Config.DEFAULT_TIMEOUT):
+def _describe_locator(selector, text_contains):
+    """Format a locator for log messages."""
+    if text_contains is None:
+        return selector
+    return f"{selector} ('{text_contains}')"
+
+
+@lru_cache(maxsize=32)
+def _waiter(driver, timeout):
+    """
+    Return a shared WebDriverWait for a driver and timeout.
+    
+    Drivers live for the whole run, so one wait per (driver, timeout) pair
+    is reused for every step of every upload.
+    """
+    return WebDriverWait(driver, timeout, ignored_exceptions=(StaleElementReferenceException,))
+
+
+@lru_cache(maxsize=None)
+def _match_element(by, selector, text_contains=None, clickable=False):
+    """
+    Build a wait condition returning the first element matching a locator.
+    
+    Conditions are cached, since each locator is waited on once per upload.
+    
+    Args:
+        by: Selenium By strategy
+        selector: Selector for the given strategy
+        text_contains: Text the element must contain, or None to skip the check
+        clickable: Whether the element must also be displayed and enabled
+        
+    Returns:
+        Callable taking a driver and returning a WebElement or False
+    """
+    def condition(driver):
+        for element in driver.find_elements(by, selector):
+            if text_contains is not None and text_contains not in element.text:
+                continue
+            if clickable and not (element.is_displayed() and element.is_enabled()):
+                continue
+            return element
+        return False
+    
+    return condition
+
+
+def wait_for_element(driver, by, selector, text_contains=None, timeout=Config.DEFAULT_TIMEOUT):
     """
     Wait for an element to be present on the page.
     
     Args:
         driver: Selenium WebDriver instance
-        xpath: XPath locator for the element
+        by: Selenium By strategy for the element
+        selector: Selector for the element
+        text_contains: Text the element must contain, or None to skip the check
         timeout: Maximum time to wait in seconds
         
     Returns:
         WebElement if found, None if timeout
     """
     try:
-        element = WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((By.XPATH, xpath))
+        element = _waiter(driver, timeout).until(
+            _match_element(by, selector, text_contains)
         )
         return element
     except TimeoutException:
-        logging.error(f"Timeout waiting for element: {xpath}")
+        logging.error(f"Timeout waiting for element: {_describe_locator(selector, text_contains)}")
         return None
 
 
-def wait_and_click(driver, xpath, timeout=Config.DEFAULT_TIMEOUT):
+def wait_and_click(driver, by, selector, text_contains=None, timeout=Config.DEFAULT_TIMEOUT):
     """
     Wait for an element to be clickable and click it.
     
     Args:
         driver: Selenium WebDriver instance
-        xpath: XPath locator for the element
+        by: Selenium By strategy for the element
+        selector: Selector for the element
+        text_contains: Text the element must contain, or None to skip the check
         timeout: Maximum time to wait in seconds
         
     Returns:
         bool: True if successful, False otherwise
     """
+    label = _describe_locator(selector, text_contains)
     try:
-        element = WebDriverWait(driver, timeout).until(
-            EC.element_to_be_clickable((By.XPATH, xpath))
+        element = _waiter(driver, timeout).until(
+            _match_element(by, selector, text_contains, clickable=True)
         )
         element.click()
-        logging.info(f"Clicked element: {xpath}")
+        logging.info(f"Clicked element: {label}")
         return True
     except TimeoutException:
-        logging.error(f"Timeout waiting to click: {xpath}")
+        logging.error(f"Timeout waiting to click: {label}")
         return False
     except Exception as e:
-        logging.error(f"Error clicking element {xpath}: {e}")
+        logging.error(f"Error clicking element {label}: {e}")
+        return False
+
+
+def wait_for_upload_form(driver):
+    """
+    Wait briefly for the upload form to return after a completed upload.
+    
+    The next upload waits for the form anyway, so a timeout here is only
+    logged at debug level.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        
+    Returns:
+        bool: True if the form is ready, False on timeout
+    """
+    try:
+        _waiter(driver, Config.FORM_READY_TIMEOUT).until(
+            _match_element(*Config.LOCATORS['file_upload'])
+        )
+        return True
+    except TimeoutException:
+        logging.debug("Upload form not ready yet; the next upload will keep waiting")
         return False
 
 
@@ -122,29 +206,29 @@ def upload_file(driver, file_path):
     
     try:
         # Step 1: Upload file
-        file_input = wait_for_element(driver, Config.XPATHS['file_upload'])
+        file_input = wait_for_element(driver, *Config.LOCATORS['file_upload'])
         if not file_input:
             return False
         
         file_input.send_keys(file_path)
         logging.info(f"File selected: {filename}")
-        time.sleep(2)  # Give it a moment to register
         
         # Step 2: Click Validate File
-        if not wait_and_click(driver, Config.XPATHS['validate_button']):
+        if not wait_and_click(driver, *Config.LOCATORS['validate_button']):
             return False
         
         # Step 3: See Validation Results
-        if not wait_and_click(driver, Config.XPATHS['see_results']):
+        if not wait_and_click(driver, *Config.LOCATORS['see_results']):
             return False
         
         # Step 4: Continue to Options
-        if not wait_and_click(driver, Config.XPATHS['continue_options']):
+        if not wait_and_click(driver, *Config.LOCATORS['continue_options']):
             return False
         
         # Step 5: Uncheck email notification if present
         try:
-            checkbox = driver.find_element(By.XPATH, Config.XPATHS['email_checkbox'])
+            by, selector, _ = Config.LOCATORS['email_checkbox']
+            checkbox = driver.find_element(by, selector)
             if checkbox.is_selected():
                 checkbox.click()
                 logging.info("Unchecked email notification")
@@ -152,15 +236,15 @@ def upload_file(driver, file_path):
             logging.info("No email checkbox found (may not be present)")
         
         # Step 6: Import Now
-        if not wait_and_click(driver, Config.XPATHS['import_now'], timeout=Config.FILE_UPLOAD_TIMEOUT):
+        if not wait_and_click(driver, *Config.LOCATORS['import_now'], timeout=Config.FILE_UPLOAD_TIMEOUT):
             return False
         
         # Step 7: View Summary
-        if not wait_and_click(driver, Config.XPATHS['view_summary']):
+        if not wait_and_click(driver, *Config.LOCATORS['view_summary']):
             return False
         
         # Step 8: Click Done
-        if not wait_and_click(driver, Config.XPATHS['done']):
+        if not wait_and_click(driver, *Config.LOCATORS['done']):
             return False
         
         logging.info(f"Successfully completed upload for: {filename}")
@@ -171,6 +255,113 @@ def upload_file(driver, file_path):
         return False
 
 
+def reset_session(driver):
+    """
+    Return a browser session to the upload form after a failed upload.
+    
+    Args:
+        driver: Selenium WebDriver instance, possibly stuck mid-wizard
+        
+    Returns:
+        bool: True if the upload form is ready again, False otherwise
+    """
+    try:
+        driver.get(Config.PLATFORM_URL)
+        return wait_for_upload_form(driver)
+    except WebDriverException as e:
+        logging.error(f"Could not reload the platform page: {e}")
+        return False
+
+
+def upload_with_pooled_driver(driver_pool, csv_entry, file_statuses, status_lock, live_sessions):
+    """
+    Upload a single CSV file using whichever browser session is free.
+    
+    After a failed upload the session is reloaded to the upload form before
+    it is returned to the pool. Sessions that cannot be recovered are dropped,
+    and once none are left the remaining files are marked as failed.
+    
+    Args:
+        driver_pool: queue.Queue of idle WebDriver instances; None marks that
+            no sessions are left
+        csv_entry: os.DirEntry for the CSV file to upload
+        file_statuses: Dictionary mapping filenames to status strings
+        status_lock: threading.Lock guarding file_statuses and live_sessions
+        live_sessions: Dictionary holding the number of usable sessions
+            under 'count'
+    """
+    csv_file = csv_entry.name
+    success = False
+    driver = driver_pool.get()
+    
+    if driver is None:
+        # Leave the marker for the other waiting workers
+        driver_pool.put(None)
+        with status_lock:
+            file_statuses[csv_file] = "FAILED"
+        logging.error(f"No browser sessions left; skipped {csv_file}")
+        return
+    
+    try:
+        success = upload_file(driver, csv_entry.path)
+        
+        # Wait for the upload form before this session takes the next file
+        if success:
+            wait_for_upload_form(driver)
+    except Exception as e:
+        logging.error(f"Browser error while processing {csv_file}: {e}")
+    finally:
+        # A failed upload can leave the session partway through the wizard
+        if success or reset_session(driver):
+            driver_pool.put(driver)
+        else:
+            logging.error(f"Dropping browser session that did not recover after {csv_file}")
+            with status_lock:
+                live_sessions['count'] -= 1
+                no_sessions_left = live_sessions['count'] == 0
+            if no_sessions_left:
+                driver_pool.put(None)
+    
+    with status_lock:
+        file_statuses[csv_file] = "SUCCESS" if success else "FAILED"
+    
+    if not success:
+        logging.warning(f"Upload failed for {csv_file}; continuing with remaining files")
+
+
+def upload_parallel(drivers, csv_entries, file_statuses):
+    """
+    Upload CSV files concurrently, one file per browser session at a time.
+    
+    Args:
+        drivers: List of authenticated WebDriver instances
+        csv_entries: List of os.DirEntry objects for the CSV files to upload
+        file_statuses: Dictionary mapping filenames to status strings
+    """
+    driver_pool = queue.Queue()
+    for driver in drivers:
+        driver_pool.put(driver)
+    status_lock = threading.Lock()
+    live_sessions = {'count': len(drivers)}
+    
+    executor = ThreadPoolExecutor(max_workers=len(drivers))
+    try:
+        futures = [
+            executor.submit(upload_with_pooled_driver, driver_pool,
+                            csv_entry, file_statuses, status_lock, live_sessions)
+            for csv_entry in csv_entries
+        ]
+        for future in futures:
+            future.result()
+    except BaseException:
+        # Don't start any queued imports once the run is interrupted
+        logging.warning("Cancelling queued uploads; waiting for uploads in progress to finish")
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    
+    executor.shutdown()
+
+
 def write_summary_log(script_dir, file_statuses):
     """
     Write a summary log of all file upload attempts.
@@ -181,34 +372,48 @@ def write_summary_log(script_dir, file_statuses):
     """
     summary_path = os.path.join(script_dir, f"upload_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
     
+    success_count = sum(1 for status in file_statuses.values() if status == "SUCCESS")
+    failure_count = len(file_statuses) - success_count
+    
+    # Build the whole log in memory and write it in one call
+    parts = [
+        f"Bulk Upload Summary - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+        "=" * 60 + "\n\n",
+        f"Total files processed: {len(file_statuses)}\n",
+        f"Successful uploads: {success_count}\n",
+        f"Failed uploads: {failure_count}\n\n",
+        "=" * 60 + "\n\n",
+    ]
+    parts.extend(f"{filename}: {status}\n" for filename, status in file_statuses.items())
+    
     with open(summary_path, "w") as f:
-        f.write(f"Bulk Upload Summary - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("=" * 60 + "\n\n")
-        
-        success_count = sum(1 for status in file_statuses.values() if status == "SUCCESS")
-        failure_count = len(file_statuses) - success_count
-        
-        f.write(f"Total files processed: {len(file_statuses)}\n")
-        f.write(f"Successful uploads: {success_count}\n")
-        f.write(f"Failed uploads: {failure_count}\n\n")
-        f.write("=" * 60 + "\n\n")
-        
-        for filename, status in file_statuses.items():
-            f.write(f"{filename}: {status}\n")
+        f.write("".join(parts))
     
     logging.info(f"Summary log written to: {summary_path}")
 
 
-def setup_driver():
+def setup_driver(profile_dir=None):
     """
     Set up and configure the Selenium WebDriver.
     
+    Args:
+        profile_dir: Optional Firefox profile directory to run with. Cookies
+            and session storage written there persist across runs.
+    
     Returns:
         WebDriver instance
     """
     options = Options()
     options.add_argument("--start-maximized")
     
+    # Use the profile in place; options.profile would copy it to a temp dir.
+    # The profile holds live session cookies, so keep it private to the user
+    if profile_dir:
+        os.makedirs(profile_dir, mode=0o700, exist_ok=True)
+        os.chmod(profile_dir, 0o700)
+        options.add_argument("-profile")
+        options.add_argument(profile_dir)
+    
     # Uncomment to run headless (no browser window)
     # options.add_argument("--headless")
     
@@ -218,8 +423,67 @@ def setup_driver():
     return driver
 
 
+def is_logged_in(driver):
+    """
+    Check whether the browser already has an authenticated session.
+    
+    Args:
+        driver: Selenium WebDriver instance on the platform page
+        
+    Returns:
+        bool: True if the upload form is available without logging in
+    """
+    try:
+        _waiter(driver, Config.LOGIN_CHECK_TIMEOUT).until(
+            _match_element(*Config.LOCATORS['file_upload'])
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def clone_session(primary_driver):
+    """
+    Open an additional browser that reuses the primary browser's login.
+    
+    Args:
+        primary_driver: Authenticated WebDriver instance
+        
+    Returns:
+        WebDriver instance carrying the primary session's cookies
+    """
+    cookies = primary_driver.get_cookies()
+    
+    # Firefox locks a profile while it is open, so clones use fresh profiles
+    driver = setup_driver()
+    
+    # Cookies can only be set for the domain currently loaded
+    driver.get(Config.PLATFORM_URL)
+    for cookie in cookies:
+        try:
+            driver.add_cookie(cookie)
+        except WebDriverException as e:
+            logging.warning(f"Could not copy cookie {cookie.get('name')}: {e}")
+    driver.get(Config.PLATFORM_URL)
+    
+    return driver
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Bulk User Management File Uploader")
+    parser.add_argument(
+        "--parallelism",
+        type=int,
+        default=1,
+        help="Number of browser sessions uploading at once (default: 1)",
+    )
+    return parser.parse_args()
+
+
 def main():
     """Main execution function."""
+    args = parse_args()
     script_dir = os.getcwd()
     logger = setup_logging(script_dir)
     
@@ -234,21 +498,25 @@ def main():
         logger.error(f"Directory not found: {csv_directory}")
         return
     
-    # Get list of CSV files
-    csv_files = [f for f in os.listdir(csv_directory) if f.endswith('.csv')]
+    # Get list of CSV files in one directory pass, in name order
+    with os.scandir(csv_directory) as entries:
+        csv_entries = sorted(
+            (e for e in entries if e.is_file() and e.name.endswith('.csv')),
+            key=lambda e: e.name,
+        )
     
-    if not csv_files:
+    if not csv_entries:
         logger.error(f"No CSV files found in: {csv_directory}")
         return
     
-    logger.info(f"Found {len(csv_files)} CSV files to process")
+    logger.info(f"Found {len(csv_entries)} CSV files to process")
     
     # Confirm before proceeding
-    print(f"\nFound {len(csv_files)} CSV files:")
-    for f in csv_files[:5]:  # Show first 5
-        print(f"  - {f}")
-    if len(csv_files) > 5:
-        print(f"  ... and {len(csv_files) - 5} more")
+    print(f"\nFound {len(csv_entries)} CSV files:")
+    for entry in csv_entries[:5]:  # Show first 5
+        print(f"  - {entry.name}")
+    if len(csv_entries) > 5:
+        print(f"  ... and {len(csv_entries) - 5} more")
     
     proceed = input("\nProceed with upload? (yes/no): ").strip().lower()
     if proceed != "yes":
@@ -257,7 +525,8 @@ def main():
     
     # Set up Selenium
     logger.info("Initializing browser...")
-    driver = setup_driver()
+    driver = setup_driver(Config.PROFILE_DIR)
+    drivers = [driver]
     file_statuses = {}
     
     try:
@@ -265,30 +534,40 @@ def main():
         driver.get(Config.PLATFORM_URL)
         logger.info(f"Navigated to: {Config.PLATFORM_URL}")
         
-        # Wait for manual login
-        input("\nPlease log in manually in the browser, then press Enter to continue...")
+        # Wait for manual login unless the saved profile is still signed in
+        if is_logged_in(driver):
+            logger.info("Reusing saved browser session; skipping manual login")
+        else:
+            input("\nPlease log in manually in the browser, then press Enter to continue...")
         
-        # Process each CSV file
-        for i, csv_file in enumerate(csv_files, 1):
-            logger.info(f"\n{'='*60}")
-            logger.info(f"Processing file {i}/{len(csv_files)}: {csv_file}")
-            logger.info(f"{'='*60}")
-            
-            file_path = os.path.join(csv_directory, csv_file)
-            
-            if upload_file(driver, file_path):
-                file_statuses[csv_file] = "SUCCESS"
-            else:
-                file_statuses[csv_file] = "FAILED"
+        # Process files across several browser sessions
+        if args.parallelism > 1:
+            logger.info(f"Opening {args.parallelism - 1} additional browser sessions...")
+            for _ in range(args.parallelism - 1):
+                drivers.append(clone_session(driver))
+            upload_parallel(drivers, csv_entries, file_statuses)
+        else:
+            # Process each CSV file
+            for i, entry in enumerate(csv_entries, 1):
+                csv_file = entry.name
+                logger.info(f"\n{'='*60}")
+                logger.info(f"Processing file {i}/{len(csv_entries)}: {csv_file}")
+                logger.info(f"{'='*60}")
                 
-                # Ask if user wants to continue
-                continue_upload = input(f"\nUpload failed for {csv_file}. Continue with remaining files? (yes/no): ").strip().lower()
-                if continue_upload != "yes":
-                    logger.info("Upload process stopped by user")
-                    break
-            
-            # Small delay between files
-            time.sleep(2)
+                if upload_file(driver, entry.path):
+                    file_statuses[csv_file] = "SUCCESS"
+                    
+                    # Wait for the upload form to be ready for the next file
+                    if i < len(csv_entries):
+                        wait_for_upload_form(driver)
+                else:
+                    file_statuses[csv_file] = "FAILED"
+                    
+                    # Ask if user wants to continue
+                    continue_upload = input(f"\nUpload failed for {csv_file}. Continue with remaining files? (yes/no): ").strip().lower()
+                    if continue_upload != "yes":
+                        logger.info("Upload process stopped by user")
+                        break
         
     except KeyboardInterrupt:
         logger.warning("\nUpload process interrupted by user")
@@ -299,7 +578,8 @@ def main():
         write_summary_log(script_dir, file_statuses)
         
         input("\nPress Enter to close the browser...")
-        driver.quit()
+        for d in drivers:
+            d.quit()
         
         logger.info("\nUpload process complete")
 